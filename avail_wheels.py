@@ -8,12 +8,17 @@ import fnmatch
 import operator
 import warnings
 import configparser
+import json
+import tempfile
+import urllib.parse
 from tabulate import tabulate, tabulate_formats
 import packaging
 import wild_requirements as requirements
 from runtime_env import RuntimeEnvironment
 from collections import defaultdict
 from itertools import chain
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 
 
 __version__ = "2.0.0"
@@ -25,6 +30,10 @@ HEADERS = ['name', 'version', 'python', 'arch']
 
 DEFAULT_STAR_ARG = ['*']
 
+# Architectures ranked from the least to the most specific instructions set.
+ARCH_RANK = {arch: rank for rank, arch in enumerate(['generic', 'sse3', 'avx', 'avx2', 'avx512'])}
+GLOB_CHARS = frozenset('*?[')
+
 
 def __warning_on_one_line(message, category, filename, lineno, file=None, line=None):
     return f'{filename}, {lineno}, {category.__name__}, {message}\n'
@@ -35,7 +44,35 @@ warnings.formatwarning = __warning_on_one_line
 
 # The wheel filename is {distribution}-{version}([-+]{build tag})?-{python tag}-{abi tag}-{platform tag}.whl.
 # The version can be numeric, alpha or alphanum or a combinaison.
-WHEEL_RE = re.compile(r"(?P<name>.+?)-(?P<version>.+?)(-(?P<build>\d[^-]*))?-(?P<tags>.+?-.+?-.+?)\.whl")
+# Wheel filenames are ASCII, and anchoring the tags as the last three dash separated parts avoids backtracking into them.
+WHEEL_RE = re.compile(r"(?P<name>[^-]+)-(?P<version>.+?)(?:-(?P<build>\d[^-]*))?-(?P<tags>[^-]+-[^-]+-[^-]+)\.whl\Z", re.ASCII)
+
+
+def split_wheel_filename(filename):
+    """
+    Split a wheel file into name, version, build, tags strings.
+
+    The format is: {name}-{version}(-{build tag})?-{python tag}-{abi tag}-{platform tag}.whl
+
+    Returns
+    -------
+    tuple
+        Split components, or None if the file is not a wheel
+    """
+    # Fast path: peel the tags from the right with plain string splits.
+    if filename.endswith('.whl'):
+        head, *tags = filename[:-4].rsplit('-', 3)
+        parts = head.split('-')
+        if len(tags) == 3 and all(tags) and all(parts) and (len(parts) == 2 or len(parts) == 3 and parts[2][0].isdigit()):
+            # Build is optional
+            return parts[0], parts[1], parts[2] if len(parts) == 3 else "", "-".join(tags)
+
+    # Uncommon filenames, like dashes in the version, are left to the regular expression.
+    m = WHEEL_RE.match(filename)
+    if m:
+        return m.group('name'), m.group('version'), m.group('build') or "", m.group('tags')
+
+    return None
 
 
 class Wheel():
@@ -54,13 +91,20 @@ class Wheel():
     Wheel(filename='numpy-1.20.1-cp38-cp38-linux_x86_64.whl', arch="", name='numpy', version=<Version('1.20.1')>, build=(), tags=frozenset({<cp38-cp38-linux_x86_64 @ 140549067913536>}))
     """
 
-    def __init__(self, filename="", arch="", name="", version="", build="", tags={}):
+    # Fields that define a wheel, used for its representation and equality.
+    _fields = ('_filename', '_arch', '_name', '_version', '_build', '_tags')
+
+    # Thousands of wheels can be created, do not carry a __dict__ per instance.
+    __slots__ = _fields + ('_loose_version',)
+
+    def __init__(self, filename="", arch="", name="", version="", build="", tags=frozenset()):
         self._filename = filename
         self._arch = arch
         self._name = name
         self._version = version
         self._build = build
         self._tags = tags
+        self._loose_version = None
 
     @staticmethod
     def parse_wheel_filename(filename, arch=""):
@@ -75,22 +119,26 @@ class Wheel():
         Wheel
             Parsed wheel
         """
-        m = WHEEL_RE.match(filename)
-        if m:
+        split = split_wheel_filename(filename)
+        if split:
+            name, version, build, tags = split
             return Wheel(
                 filename=filename,
                 arch=arch,
-                name=m.group('name'),
-                version=m.group('version'),
-                build=m.group('build') or "",  # Build is optional
-                tags=packaging.tags.parse_tag(m.group('tags')),
+                name=name,
+                version=version,
+                build=build,
+                tags=packaging.tags.parse_tag(tags),
             )
         else:
             warnings.warn(f"Could not get tags for : {filename}")
             return Wheel(filename=filename, arch=arch)
 
     def loose_version(self):
-        return packaging.version.parse(self._version)
+        # Parsed on first use only, then reused by every sort comparison and version lookups.
+        if self._loose_version is None:
+            self._loose_version = packaging.version.parse(self._version)
+        return self._loose_version
 
     @property
     def filename(self):
@@ -136,28 +184,27 @@ class Wheel():
         return self._filename
 
     def __repr__(self):
-        return "Wheel({})".format(", ".join(f"{k[1:]}={v!r}" for k, v in self.__dict__.items()))
+        return "Wheel({})".format(", ".join(f"{k[1:]}={getattr(self, k)!r}" for k in self._fields))
 
     def __eq__(self, other):
         if not isinstance(other, Wheel):
             return NotImplemented
 
-        return self.__dict__ == other.__dict__
+        return all(getattr(self, k) == getattr(other, k) for k in self._fields)
 
 
-def is_compatible(wheel, pythons):
+def get_compatible_tags(pythons):
     """
-    Verify that the wheel tags are compatible with currently supported tags.
+    Returns the union of the compatible tags of the given python versions.
     """
-    return any(not wheel.tags.isdisjoint(env.compatible_tags[p]) for p in pythons)
+    return frozenset().union(*(env.compatible_tags[p] for p in pythons))
 
 
-def match_file(file, rexes):
-    """ Match file with one or more regular expressions. """
-    for rex in rexes:
-        if re.match(rex, file):
-            return True
-    return False
+def is_compatible(wheel, pythons):
+    """
+    Verify that the wheel tags are compatible with currently supported tags.
+    """
+    return not wheel.tags.isdisjoint(get_compatible_tags(pythons))
 
 
 def match_version(wheel, reqs):
@@ -168,50 +215,169 @@ def match_version(wheel, reqs):
     if wheel.name in reqs:
         return wheel.version in reqs[wheel.name].specifier
     else:
-        return any(re.match(fnmatch.translate(req_name), wheel.name, re.IGNORECASE) and wheel.version in req.specifier for req_name, req in reqs.items())
+        return any(compile_glob(req_name)(wheel.name) and wheel.version in req.specifier for req_name, req in reqs.items())
 
 
-def get_rexes(reqs):
+def is_glob(pattern):
+    """ Returns whether the pattern has any globbing characters. """
+    return not GLOB_CHARS.isdisjoint(pattern)
+
+
+@lru_cache(maxsize=None)
+def compile_glob(pattern):
     """
-    Returns the patterns to match file names (case insensitive).
-    Supports exact matching and globbing of name.
-    pattern: name-*.whl
+    Returns a function that matches a whole string with the glob pattern (case insensitive).
+
+    Patterns with `*` only are matched with plain string searches,
+    other patterns (`?`, `[seq]`) fall back to a regular expression from `fnmatch`.
     """
-    return [re.compile(fnmatch.translate(f"{req}-*.whl"), re.IGNORECASE) for req in reqs]
+    if '?' in pattern or '[' in pattern:
+        return re.compile(fnmatch.translate(pattern), re.IGNORECASE).match
+
+    pattern = pattern.lower()
+    if '*' not in pattern:
+        return lambda string: string.lower() == pattern
+
+    # The first and last parts are anchored, the ones in between are searched from left to right.
+    first, *middle, last = pattern.split('*')
+
+    def _match(string):
+        string = string.lower()
+        start, end = len(first), len(string) - len(last)
+        if start > end or not string.startswith(first) or not string.endswith(last):
+            return False
+
+        for part in middle:
+            start = string.find(part, start, end)
+            if start < 0:
+                return False
+            start += len(part)
+
+        return True
+
+    return _match
+
+
+def get_prefixes(reqs):
+    """
+    Returns the prefixes to match file names (lowercased) of names without globbing.
+    pattern: name-
+    """
+    return tuple(f"{req}-".lower() for req in reqs if not is_glob(req))
+
+
+def list_files(path, cache_dir=None):
+    """
+    Returns the wheels files names of a wheelhouse path.
+    The wheelhouse layout is flat ({arch}/*.whl), hence sub-directories and other files are skipped.
+
+    When a cache directory is given, the listing is stored there and reused
+    as long as the path modification time and size are unchanged.
+    Errors on the cache are ignored, the path is then read again.
+    """
+    def _scandir(path):
+        with os.scandir(path) as it:
+            # The suffix check is the cheapest, and the dirent type is reused: no stat call is needed.
+            return [entry.name for entry in it if entry.name.endswith('.whl') and not entry.is_dir(follow_symlinks=False)]
+
+    if cache_dir is None:
+        return _scandir(path)
 
+    st = os.stat(path)
+    key = [path, st.st_mtime_ns, st.st_size]
+    # The quoted path is a filename-safe and unique name.
+    cache_file = os.path.join(cache_dir, f"{urllib.parse.quote(path, safe='')}.json")
 
-def get_wheels(paths, reqs, pythons, latest):
+    try:
+        with open(cache_file) as f:
+            cache = json.load(f)
+        if cache["key"] == key:
+            return cache["files"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    files = _scandir(path)
+
+    # Write to a temporary file then rename, so concurrent invocations never read a partial cache.
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=cache_dir, suffix=".tmp", delete=False) as f:
+            json.dump({"key": key, "files": files}, f)
+        os.replace(f.name, cache_file)
+    except OSError:
+        pass
+
+    return files
+
+
+def get_wheels(paths, reqs, pythons, latest, cache_dir=None):
     """
     Glob the full list of wheels in the wheelhouse on CVMFS.
     Can also be filterd on arch, name, version or python.
+    The listing of the paths is cached in `cache_dir`, if given.
     Return a dict of wheel name and list of tags.
     """
+    def _scan_path(path):
+        """
+        Get wheels from a single wheelhouse path.
+        Like `os.walk`, unreadable or missing paths are ignored.
+        """
+        try:
+            return list_files(path, cache_dir)
+        except OSError:
+            return []
+
     def _get_wheels_from_fs(paths):
         """
-        Get wheels from the wheelhouse paths.
+        Get wheels from the wheelhouse paths, as the arch (parent folder) and the files of each path.
+        Directory reads on CVMFS are latency bound and release the GIL, hence paths are read concurrently.
+        Results keep the order of the paths.
         """
-        for path in paths:
-            arch = os.path.basename(path)
-            for _, _, files in os.walk(f"{path}"):
-                for file in files:
-                    yield arch, file
+        with ThreadPoolExecutor(max_workers=min(32, len(paths)) or 1) as executor:
+            yield from zip(map(os.path.basename, paths), executor.map(_scan_path, paths))
 
     wheels = defaultdict(list)
+    # Compute the tags once, rather than per python for every wheel.
+    compatible_tags = get_compatible_tags(pythons)
+    # A compatible wheel spells one of the interpreters in its filename, even compressed (py2.py3).
+    # Interpreters containing a shorter one are redundant (py36 contains py3).
+    interpreters = frozenset(tag.interpreter for tag in compatible_tags)
+    interpreters = [i for i in interpreters if not any(j != i and j in i for j in interpreters)]
+
+    def _may_be_compatible(file):
+        """
+        Cheap substring check to skip the parsing of wheels that would be rejected anyway.
+        Tags are parsed lowercased, hence the file is lowercased as well.
+        """
+        file = file.lower()
+        return any(interpreter in file for interpreter in interpreters)
+
+    def _match_file(file, prefixes, globs):
+        """
+        Exact names, the common case, are matched on their prefix, only globbing names need a glob matching.
+        Files are already known to be wheels (.whl).
+        """
+        return file.lower().startswith(prefixes) or any(glob(file) for glob in globs)
 
     if reqs:
-        rexes = get_rexes(reqs)
-        for arch, file in _get_wheels_from_fs(paths):
-            if match_file(file, rexes):
-                wheel = Wheel.parse_wheel_filename(file, arch)
-                if match_version(wheel, reqs) and is_compatible(wheel, pythons):
-                    wheels[wheel.name].append(wheel)
+        prefixes = get_prefixes(reqs)
+        globs = [compile_glob(f"{req}-*.whl") for req in reqs if is_glob(req)]
+        for arch, files in _get_wheels_from_fs(paths):
+            for file in files:
+                if _match_file(file, prefixes, globs) and _may_be_compatible(file):
+                    wheel = Wheel.parse_wheel_filename(file, arch)
+                    if match_version(wheel, reqs) and not wheel.tags.isdisjoint(compatible_tags):
+                        wheels[wheel.name].append(wheel)
 
     # Display all available wheels that are compatible (no reqs were given)
     else:
-        for arch, file in _get_wheels_from_fs(paths):
-            wheel = Wheel.parse_wheel_filename(file, arch)
-            if is_compatible(wheel, pythons):
-                wheels[wheel.name].append(wheel)
+        for arch, files in _get_wheels_from_fs(paths):
+            for file in files:
+                if not _may_be_compatible(file):
+                    continue
+                wheel = Wheel.parse_wheel_filename(file, arch)
+                if not wheel.tags.isdisjoint(compatible_tags):
+                    wheels[wheel.name].append(wheel)
 
     # Filter versions
     return latest_versions(wheels) if latest else wheels
@@ -223,63 +389,85 @@ def latest_versions(wheels):
     """
     latests = defaultdict(list)
 
+    # Find the latest version, then keep its wheels: linear, no sort is needed.
     for wheel_name, wheel_list in wheels.items():
-        wheel_list.sort(key=operator.methodcaller('loose_version'), reverse=True)
-        latests[wheel_name] = []
-        latest = wheel_list[0].loose_version()
-
-        for wheel in wheel_list:
-            if latest == wheel.loose_version():
-                latests[wheel_name].append(wheel)
-            else:
-                break
+        latest = max(wheel.loose_version() for wheel in wheel_list)
+        latests[wheel_name] = [wheel for wheel in wheel_list if wheel.loose_version() == latest]
 
     return latests
 
 
+def arch_key(arch):
+    """
+    Sort key of an architecture, by its instructions set rank.
+    Unknown architectures come first, by name.
+    """
+    return ARCH_RANK.get(arch, -1), arch
+
+
+def python_key(python):
+    """
+    Sort key of interpreters (`cp36`, `py2,py3`), by their most recent python version.
+    Hence `cp310` comes after `cp39`, and `py3` before `cp36`.
+    """
+    versions = [(int(i[2]), int(i[3:] or -1)) for i in python.split(',') if i[2:].isdigit()]
+    return max(versions, default=(-1, -1)), python
+
+
+# Sort keys of the columns that are not sorted as versions.
+COLUMN_KEYS = {'arch': arch_key, 'python': python_key}
+
+
 def sort(wheels, columns, condense=False):
     """
     Transforms dict of wheels to a list of lists
     where the columns are the wheel tags.
     """
 
+    @lru_cache(maxsize=None)
     def loose_key(x):
         """
         Everything and nothing can be a version, loosely!
+        Tag values repeat a lot across wheels (arch, python, ...), hence parse each one only once.
         """
         return packaging.version.parse(x)
 
-    ret = []
     sep = ", "
-
-    # Sort in-place, by name insensitively asc, then by version desc, then by arch desc, then by python desc
-    # Since the sort is stable and Timsort can benefit from previous sort, this is fast.
     wheel_names = sorted(wheels.keys(), key=lambda s: s.casefold())
-    for wheel_name in wheel_names:
-        wheel_list = wheels[wheel_name]
-        wheel_list.sort(key=operator.attrgetter('python'), reverse=True)
-        wheel_list.sort(key=operator.attrgetter('arch'), reverse=True)
-        wheel_list.sort(key=operator.methodcaller('loose_version'), reverse=True)
-
-        # Condense wheel information on one line.
-        # For every column, every wheel, insert the tag into a uniq set, then join tag values and re-sort.
-        # Otherwise, get the columns.
-        if condense:
+
+    # Condense wheel information on one line.
+    # For every column, every wheel, insert the tag into a uniq set, then join tag values and re-sort.
+    # The order of the wheels does not matter here.
+    if condense:
+        ret = []
+        for wheel_name in wheel_names:
             row = []
             dwheel = {}
             for column in columns:
                 dwheel[column] = set()
 
-                for wheel in wheel_list:
+                for wheel in wheels[wheel_name]:
                     dwheel[column].add(getattr(wheel, column))
 
-                row.append(sep.join(sorted(dwheel.get(column), key=loose_key, reverse=True)))
+                key = COLUMN_KEYS.get(column, loose_key)
+                row.append(sep.join(sorted(dwheel.get(column), key=key, reverse=True)))
 
             ret.append(row)
-        else:
-            ret.extend([[getattr(wheel, column) for column in columns] for wheel in wheel_list])
 
-    return ret
+        return ret
+
+    # Sort by name insensitively asc, then by version desc, then by arch rank desc, then by python version desc.
+    # All wheels are sorted at once on a composite key, with the name rank negated so that it is sorted asc.
+    ranked_wheels = [(rank, wheel) for rank, wheel_name in enumerate(wheel_names) for wheel in wheels[wheel_name]]
+    ranked_wheels.sort(key=lambda rw: (-rw[0], rw[1].loose_version(), arch_key(rw[1].arch), python_key(rw[1].python)), reverse=True)
+
+    if not ranked_wheels:
+        return []
+
+    # Resolve the columns once, rather than a getattr per column for every wheel.
+    # attrgetter returns a tuple for many columns, a single value otherwise.
+    values = map(operator.attrgetter(*columns), (wheel for _, wheel in ranked_wheels))
+    return list(map(list, values)) if len(columns) > 1 else [[value] for value in values]
 
 
 def add_not_available_wheels(wheels, reqs, not_available_only=False):
@@ -441,6 +629,8 @@ def create_argparser():
     display_group.add_argument("--not-available", action='store_true', help="Also display wheels that were not available.")
     display_group.add_argument("--not-available-only", action='store_true', help="Display only wheels that were not available.")
 
+    parser.add_argument("--cache", action='store_true', help=f"Cache the wheelhouse listing in {env.cache_directory}, and reuse it until the wheelhouse changes.")
+
     return parser
 
 
@@ -457,7 +647,7 @@ def main():
     pythons = args.python if not args.all_pythons else env.available_pythons
     latest = not args.all_versions and args.specifier is None
 
-    wheels = get_wheels(search_paths, reqs, pythons, latest)
+    wheels = get_wheels(search_paths, reqs, pythons, latest, cache_dir=env.cache_directory if args.cache else None)
 
     if args.not_available or args.not_available_only:
         wheels = add_not_available_wheels(wheels, reqs, args.not_available_only)
@@ -466,8 +656,10 @@ def main():
     # https://docs.python.org/3/library/signal.html#note-on-sigpipe
     try:
         if args.raw:
-            for wheel_list in wheels.values():
-                print(*wheel_list, sep='\n')
+            # Write all file names at once, rather than a print per wheel name.
+            filenames = [wheel.filename for wheel_list in wheels.values() for wheel in wheel_list]
+            if filenames:
+                sys.stdout.write("\n".join(filenames) + "\n")
         else:
             wheels = sort(wheels, args.column, args.condense)
             print(tabulate(wheels, headers=args.column, tablefmt="mediawiki" if args.mediawiki else args.format))
@@ -21,6 +21,7 @@ class RuntimeEnvironment(object):
     _wheelhouse = None
     _current_python = None
     _pip_config_file = None
+    _cache_directory = None
     _python_dirs = None
     _current_architecture = None
     _available_architectures = frozenset(["avx", "avx2", "avx512", "generic", "sse3"])
@@ -62,6 +63,25 @@ class RuntimeEnvironment(object):
 
         return self._pip_config_file
 
+    @property
+    def cache_directory(self):
+        """
+        Returns the cache directory of avail_wheels, under the `XDG_CACHE_HOME` environment variable.
+
+        Default: ~/.cache/avail_wheels
+
+        Returns
+        -------
+        str
+            Path to the cache directory
+        """
+        if not self._cache_directory:
+            self._cache_directory = os.path.join(
+                os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "avail_wheels"
+            )
+
+        return self._cache_directory
+
     @property
     def current_python(self):
         """
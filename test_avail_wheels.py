@@ -1,9 +1,8 @@
 from io import StringIO
 from argparse import ArgumentError
 from contextlib import redirect_stderr
-from fnmatch import translate
-import re
 import os
+import json
 import avail_wheels
 from runtime_env import RuntimeEnvironment
 from collections import defaultdict
@@ -192,6 +191,28 @@ def test_wheel_parse_tags():
         assert wheel.platform == tags[file]["platform"]
 
 
+def test_wheel_parse_tags_dashed_version():
+    """
+    Test that Wheel parse_wheel_filename keeps the last three parts as tags when the version has dashes.
+    """
+    wheel = avail_wheels.Wheel.parse_wheel_filename("pkg-1.0-rc1-2-py3-none-any.whl", "generic")
+    assert wheel.name == "pkg"
+    assert wheel.loose_version() == packaging.version.Version("1.0rc1")
+    assert wheel.build == "2"
+    assert wheel.python == "py3"
+    assert wheel.abi == "none"
+    assert wheel.platform == "any"
+
+
+def test_split_wheel_filename():
+    """
+    Test that split_wheel_filename returns the name, version, build and tags strings, or None.
+    """
+    assert avail_wheels.split_wheel_filename("netCDF4-1.3.1-cp36-cp36m-linux_x86_64.whl") == ("netCDF4", "1.3.1", "", "cp36-cp36m-linux_x86_64")
+    assert avail_wheels.split_wheel_filename("pydicom-1.1.0-1-py2.py3-none-any.whl") == ("pydicom", "1.1.0", "1", "py2.py3-none-any")
+    assert avail_wheels.split_wheel_filename("invalid-cp36.whl") is None
+
+
 def test_wheel_loose_version():
     """Test that the string repr of version is a parsed version."""
     wheel = avail_wheels.Wheel(version="1.2+cc")
@@ -201,6 +222,14 @@ def test_wheel_loose_version():
     assert loose_version == packaging.version.Version("1.2+cc")
 
 
+def test_wheel_loose_version_cached():
+    """Test that the version is parsed once and reused."""
+    wheel = avail_wheels.Wheel(version="1.2+cc")
+
+    assert wheel.loose_version() is wheel.loose_version()
+    assert wheel == avail_wheels.Wheel(version="1.2+cc")
+
+
 def test_latest_versions_method_all_pythons():
     """
     Test that the latest version are returned.
@@ -290,15 +319,15 @@ def test_sort_columns(to_be_sorted_wheels):
         ["botocore", "1.9.11", "", "py2,py3", "generic"],
         ["botocore", "1.9.5", "", "py2,py3", "generic"],
         ["netCDF4", "1.4.0", "", "cp27", "generic"],
-        ["netCDF4", "1.3.1", "", "cp36", "sse3"],
-        ["netCDF4", "1.3.1", "", "cp35", "sse3"],
-        ["netCDF4", "1.3.1", "", "cp27", "sse3"],
         ["netCDF4", "1.3.1", "", "cp36", "avx2"],
         ["netCDF4", "1.3.1", "", "cp35", "avx2"],
         ["netCDF4", "1.3.1", "", "cp27", "avx2"],
         ["netCDF4", "1.3.1", "", "cp36", "avx"],
         ["netCDF4", "1.3.1", "", "cp35", "avx"],
         ["netCDF4", "1.3.1", "", "cp27", "avx"],
+        ["netCDF4", "1.3.1", "", "cp36", "sse3"],
+        ["netCDF4", "1.3.1", "", "cp35", "sse3"],
+        ["netCDF4", "1.3.1", "", "cp27", "sse3"],
         ["netCDF4", "1.2.8", "", "cp27", "generic"],
         ["pydicom", "1.1.0", "1", "py2,py3", "generic"],
         ["pydicom", "0.9.9", "", "py3", "generic"],
@@ -307,11 +336,28 @@ def test_sort_columns(to_be_sorted_wheels):
     ]
 
 
+def test_arch_key():
+    """ Test that architectures are sorted by instructions set, unknown ones first. """
+    archs = ["avx", "potato", "avx512", "generic", "sse3", "avx2"]
+    assert sorted(archs, key=avail_wheels.arch_key) == ["potato", "generic", "sse3", "avx", "avx2", "avx512"]
+
+
+def test_python_key():
+    """ Test that interpreters are sorted by their most recent python version. """
+    pythons = ["cp39", "cp310", "py3", "cp27", "py2,py3", "cp35,cp36,cp37,cp38", ""]
+    assert sorted(pythons, key=avail_wheels.python_key) == ["", "cp27", "py2,py3", "py3", "cp35,cp36,cp37,cp38", "cp39", "cp310"]
+
+
+def test_sort_single_column(to_be_sorted_wheels):
+    """ Test that sort returns rows of one value for a single column. """
+    assert avail_wheels.sort(to_be_sorted_wheels, ['version'])[:3] == [["1.10.63"], ["1.10.57"], ["1.9.11"]]
+
+
 def test_sort_condense(to_be_sorted_wheels):
     """ Test that sort return condensed information on one line. """
     assert avail_wheels.sort(to_be_sorted_wheels, ['name', 'version', 'build', 'python', 'arch'], True) == [
         ["botocore", "1.10.63, 1.10.57, 1.9.11, 1.9.5", "", "py2,py3", "generic"],
-        ["netCDF4", "1.4.0, 1.3.1, 1.2.8", "", "cp36, cp35, cp27", "sse3, generic, avx2, avx"],
+        ["netCDF4", "1.4.0, 1.3.1, 1.2.8", "", "cp36, cp35, cp27", "avx2, avx, sse3, generic"],
         ["pydicom", "1.1.0, 0.9.9", "1, ", "py3, py2,py3", "generic"],
         ["torch_cpu", "0.4.0, 0.2.0", "", "cp36, cp27", "avx2"],
     ]
@@ -476,6 +522,81 @@ def test_get_wheels_wrongversion_wildname_arch_python(wheelhouse):
     assert ret == other
 
 
+def test_list_files_wheels_only(tmp_path):
+    """ Test that only wheels files are listed, other files and directories are skipped. """
+    (tmp_path / "numpy-1.20.1-cp38-cp38-linux_x86_64.whl").touch()
+    (tmp_path / "README.txt").touch()
+    (tmp_path / "old.whl").mkdir()
+
+    assert avail_wheels.list_files(str(tmp_path)) == ["numpy-1.20.1-cp38-cp38-linux_x86_64.whl"]
+
+
+def test_get_wheels_uppercase_tags(tmp_path):
+    """ Test that get wheels matches tags case insensitively. """
+    (tmp_path / "generic").mkdir()
+    (tmp_path / "generic" / "numpy-1.20.1-CP36-CP36M-LINUX_X86_64.whl").touch()
+
+    ret = avail_wheels.get_wheels(paths=[str(tmp_path / "generic")], pythons=["3.6"], reqs=None, latest=False)
+    assert ret == {
+        "numpy": [avail_wheels.Wheel.parse_wheel_filename("numpy-1.20.1-CP36-CP36M-LINUX_X86_64.whl", "generic")]
+    }
+
+
+def test_get_wheels_invalid_wheel(tmp_path):
+    """ Test that get wheels skips, with a warning, a wheel that can not be parsed. """
+    (tmp_path / "generic").mkdir()
+    (tmp_path / "generic" / "invalid-cp36.whl").touch()
+
+    with pytest.warns(UserWarning, match="invalid-cp36.whl"):
+        ret = avail_wheels.get_wheels(paths=[str(tmp_path / "generic")], pythons=["3.6"], reqs=None, latest=False)
+    assert ret == {}
+
+
+def test_list_files_cache(wheelhouse, tmp_path):
+    """ Test that the listing of a path is cached and reused until the path changes. """
+    path = wheelhouse / "gentoo/avx2"
+    cache_dir = tmp_path / "cache"
+    files = [
+        "tensorflow_gpu-1.8.0+computecanada-cp27-cp27mu-linux_x86_64.whl",
+        "tensorflow_gpu-1.8.0+computecanada-cp35-cp35m-linux_x86_64.whl",
+        "tensorflow_gpu-1.8.0+computecanada-cp36-cp36m-linux_x86_64.whl",
+    ]
+
+    assert sorted(avail_wheels.list_files(str(path), str(cache_dir))) == files
+
+    # The cached listing is used while the path is unchanged.
+    (cache_file,) = cache_dir.iterdir()
+    cache = json.loads(cache_file.read_text())
+    cache_file.write_text(json.dumps({"key": cache["key"], "files": ["cached.whl"]}))
+    assert avail_wheels.list_files(str(path), str(cache_dir)) == ["cached.whl"]
+
+    # A new file changes the path, hence it is read again.
+    (path / "torch_cpu-0.4.0-cp36-cp36m-linux_x86_64.whl").touch()
+    assert sorted(avail_wheels.list_files(str(path), str(cache_dir))) == files + ["torch_cpu-0.4.0-cp36-cp36m-linux_x86_64.whl"]
+
+
+def test_get_wheels_many_paths_missing_path(wheelhouse):
+    """ Test that get wheels merges wheels from many paths and ignores missing paths. """
+    search_paths = [f"{str(wheelhouse)}/gentoo/avx2", f"{str(wheelhouse)}/gentoo/missing", f"{str(wheelhouse)}/nix/generic"]
+    pythons = ["3.6"]
+    other = {
+        "scipy": [
+            avail_wheels.Wheel.parse_wheel_filename("scipy-1.1.0-cp36-cp36m-linux_x86_64.whl", "generic")
+        ],
+        "tensorflow_gpu": [
+            avail_wheels.Wheel.parse_wheel_filename("tensorflow_gpu-1.8.0+computecanada-cp36-cp36m-linux_x86_64.whl", "avx2")
+        ],
+    }
+
+    ret = avail_wheels.get_wheels(
+        paths=search_paths,
+        pythons=pythons,
+        reqs=None,
+        latest=False,
+    )
+    assert ret == other
+
+
 def test_parse_args_default_arch():
     """ Test that default argument parser value for --arch is None """
     # TODO: monkeypatch
@@ -579,6 +700,11 @@ def test_parse_args_default_mediawiki():
     assert not avail_wheels.create_argparser().get_default("mediawiki")
 
 
+def test_parse_args_default_cache():
+    """ Test that default argument parser value for --cache is False. """
+    assert not avail_wheels.create_argparser().get_default("cache")
+
+
 def test_parse_args_version():
     """ Test that --version is and support the wildcard version. """
     version = "1.2*"
@@ -734,53 +860,38 @@ def test_is_compatible_many(python_dirs):
     assert avail_wheels.is_compatible(wheel, ["2.7", "3.8"])
 
 
-def test_match_file_sensitive_true():
-    """ Test that match file name case sensitevely."""
-    assert avail_wheels.match_file(
-        "netCDF4-1.3.1-cp27-cp27mu-linux_x86_64.whl",
-        avail_wheels.get_rexes(["netCDF4"]),
-    )
-
-
-def test_match_file_insensitive_true():
-    """Test that match file name case insensitevely."""
-    assert avail_wheels.match_file(
-        "netCDF4-1.3.1-cp27-cp27mu-linux_x86_64.whl",
-        avail_wheels.get_rexes(["netcdf4"]),
-    )
-    assert avail_wheels.match_file(
-        "netcdf4-1.3.1-cp27-cp27mu-linux_x86_64.whl",
-        avail_wheels.get_rexes(["netCDF4"]),
-    )
-
-
-def test_match_file_false():
-    """Test that do not match file name case sensitevely and insensitevely."""
-    assert not avail_wheels.match_file("None", avail_wheels.get_rexes(["netcdf4"]))
+def test_get_compatible_tags(python_dirs):
+    """ Test that compatible tags of many pythons are merged into a single set. """
+    avail_wheels.env = RuntimeEnvironment()
+    compatible_tags = avail_wheels.get_compatible_tags(["2.7", "3.8"])
 
-# TODO : add test match file false default
+    assert isinstance(compatible_tags, frozenset)
+    assert compatible_tags == avail_wheels.env.compatible_tags["2.7"] | avail_wheels.env.compatible_tags["3.8"]
+    assert avail_wheels.get_compatible_tags([]) == frozenset()
 
 
-def test_get_rexes():
-    """
-    Test that rexes are compiled for given patterns.
+def test_is_glob():
+    """Test that names with globbing characters are detected."""
+    assert avail_wheels.is_glob("*cdf*")
+    assert avail_wheels.is_glob("nump?")
+    assert avail_wheels.is_glob("[n]umpy")
+    assert not avail_wheels.is_glob("Scikit-learn")
 
-    The fnmatch.translate implementation has changed in Python 3.9.
-    The group created from a star is unique and this results in a false equality when you compare two identical patterns.
-    https://github.com/python/cpython/blob/e8f2fe355b82a3eb3c64ee6e1c44f31c020cf97d/Lib/fnmatch.py#L159
 
-    E         - [re.compile('(?s:Nump(?=(?P<g1>.*?\\-))(?P=g1).*\\.whl)\\Z', re.IGNORECASE)]
-    E         ?                              ^              ^
-    E         + [re.compile('(?s:Nump(?=(?P<g0>.*?\\-))(?P=g0).*\\.whl)\\Z', re.IGNORECASE)]
+def test_compile_glob():
+    """Test that globs match whole strings case insensitively, with or without a regular expression."""
+    assert avail_wheels.compile_glob("*cdf*")("netCDF4")
+    assert avail_wheels.compile_glob("net*4-*.whl")("netCDF4-1.3.1-cp27-cp27mu-linux_x86_64.whl")
+    assert avail_wheels.compile_glob("numpy")("NumPy")
+    assert avail_wheels.compile_glob("nump?")("numpy")
+    assert not avail_wheels.compile_glob("*cdf")("netCDF4")
+    assert not avail_wheels.compile_glob("a*a")("a")
+    assert not avail_wheels.compile_glob("numpy")("numpy2")
 
-    Hence we can't test for Nump*-*.whl patterns
-    """
 
-    rexes = [
-        re.compile(translate(pattern), re.IGNORECASE)
-        for pattern in ["numpy-*.whl", "Scikit-learn-*.whl"]
-    ]
-    assert avail_wheels.get_rexes(["numpy", "Scikit-learn"]) == rexes
+def test_get_prefixes():
+    """Test that lowercase prefixes are returned for names without globbing only."""
+    assert avail_wheels.get_prefixes(["numpy", "*cdf*", "Scikit-learn"]) == ("numpy-", "scikit-learn-")
 
 
 def test_add_not_available_wheels_empty():
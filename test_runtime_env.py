@@ -44,6 +44,23 @@ def test_pip_config_file_variable(monkeypatch):
     assert RuntimeEnvironment().pip_config_file == "pip.conf"
 
 
+def test_cache_directory_default(monkeypatch):
+    """
+    Test that the default cache directory is ~/.cache/avail_wheels
+    """
+    monkeypatch.delenv("XDG_CACHE_HOME", raising=False)
+    monkeypatch.setenv("HOME", "/home/potato")
+    assert RuntimeEnvironment().cache_directory == "/home/potato/.cache/avail_wheels"
+
+
+def test_cache_directory_variable(monkeypatch):
+    """
+    Test that the cache directory is read from XDG_CACHE_HOME enviroment variable.
+    """
+    monkeypatch.setenv("XDG_CACHE_HOME", "potato/cache")
+    assert RuntimeEnvironment().cache_directory == "potato/cache/avail_wheels"
+
+
 def test_current_python_default(monkeypatch):
     """
     Test that the default current_python is None